@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+import os
+import sys
+import stat
+import queue
+import socket
+import threading
+import socketserver
+
+from sig_agent_hook_handler import (
+    log,
+    MAX_FRAME_SIZE,
+    DAEMON_ACK,
+    DAEMON_NACK,
+    config_fingerprint,
+    read_config,
+    parse_hook_input,
+    get_socket_path,
+    open_connection,
+    send_to_sigagent,
+)
+
+class HookFrameHandler(socketserver.StreamRequestHandler):
+    """
+    Read one hook payload from sig_agent_hook_handler.py, queue it for
+    upload and acknowledge it. The frame is the sender's config
+    fingerprint, a 4-byte big-endian length and the payload. Frames from a
+    hook handler configured with another endpoint or token are rejected;
+    a payload that is not acknowledged is uploaded by the hook handler
+    itself.
+    """
+    # Seconds a client may stall mid-frame before its thread gives up
+    timeout = 5
+
+    def handle(self):
+        try:
+            fingerprint_size = len(self.server.config_fingerprint)
+            header = self.rfile.read(fingerprint_size + 4)
+            if not header:
+                # Connect-and-close liveness probe from daemon_running()
+                return
+            if len(header) != fingerprint_size + 4:
+                log("Error: truncated frame header from hook handler", is_error=True)
+                return
+
+            if header[:fingerprint_size] != self.server.config_fingerprint:
+                log("Hook handler uses a different endpoint or token, rejecting hook payload")
+                self.wfile.write(DAEMON_NACK)
+                return
+
+            length = int.from_bytes(header[fingerprint_size:], 'big')
+            if length > MAX_FRAME_SIZE:
+                log(f"Error: hook payload of {length} bytes exceeds {MAX_FRAME_SIZE}", is_error=True)
+                self.wfile.write(DAEMON_NACK)
+                return
+
+            hook_json = self.rfile.read(length)
+            if len(hook_json) != length:
+                log("Error: truncated hook payload from hook handler", is_error=True)
+                return
+
+            self.server.hook_queue.put(hook_json)
+            self.wfile.write(DAEMON_ACK)
+        except OSError as e:
+            log(f"Error reading hook payload from hook handler: {e}", is_error=True)
+
+def upload_worker(server, conn, sigagent_url, sigagent_token):
+    """
+    Upload queued hook payloads in arrival order over one long-lived
+    connection, so consecutive hooks skip the TCP and TLS handshakes.
+    If the worker ever stops, the server is shut down so hook handlers
+    stop forwarding to a daemon that can no longer upload.
+    """
+    try:
+        while True:
+            hook_json = server.hook_queue.get()
+            try:
+                transcript_path = parse_hook_input(hook_json)
+                if not transcript_path:
+                    continue
+
+                # A connection the server closed while idle is retried inside
+                # send_to_sigagent; after any other failure start over on a new one
+                if not send_to_sigagent(conn, sigagent_url, sigagent_token, hook_json, transcript_path):
+                    conn.close()
+            except Exception as e:
+                log(f"Error uploading hook data: {e}", is_error=True)
+                conn.close()
+    finally:
+        log("Error: upload worker stopped, shutting down sig-agent daemon", is_error=True)
+        server.shutdown()
+
+def daemon_running(socket_path):
+    """
+    Check whether another daemon is already accepting on socket_path.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def main():
+    sigagent_url, sigagent_token = read_config()
+    if not sigagent_url or not sigagent_token:
+        print("Error: OTEL_EXPORTER_OTLP_ENDPOINT and OTEL_EXPORTER_OTLP_HEADERS "
+              "with Authorization=Bearer token are required", file=sys.stderr)
+        sys.exit(1)
+
+    socket_path = get_socket_path()
+    if not socket_path:
+        print("Error: SIG_AGENT_SOCKET or XDG_RUNTIME_DIR must be set", file=sys.stderr)
+        sys.exit(1)
+
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            print(f"Error: {socket_path} exists and is not a socket", file=sys.stderr)
+            sys.exit(1)
+        if daemon_running(socket_path):
+            print(f"Error: sig-agent daemon already running on {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        # Stale socket from a previous run
+        os.unlink(socket_path)
+
+    # Validate the endpoint before accepting any hooks
+    try:
+        conn = open_connection(sigagent_url)
+    except ValueError as e:
+        print(f"Error: invalid OTEL_EXPORTER_OTLP_ENDPOINT: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Only the current user may connect; payloads name files to upload
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, HookFrameHandler)
+    finally:
+        os.umask(old_umask)
+    server.hook_queue = queue.Queue()
+    server.config_fingerprint = config_fingerprint(sigagent_url, sigagent_token)
+
+    worker = threading.Thread(target=upload_worker, args=(server, conn, sigagent_url, sigagent_token),
+                              daemon=True)
+    worker.start()
+
+    log(f"sig-agent daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+if __name__ == "__main__":
+    main()
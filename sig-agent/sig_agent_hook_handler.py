@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
 import json
+import re
 import sys
 import os
 import time
-import ssl
-import tempfile
-from datetime import datetime
-from urllib.parse import urlparse
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
+import zlib
+from datetime import datetime, timezone
 
+# Prefer orjson for parsing; it works on bytes natively
 try:
-    import certifi
-    CERTIFI_AVAILABLE = True
+    import orjson
+    json_loads = orjson.loads
 except ImportError:
-    CERTIFI_AVAILABLE = False
+    json_loads = json.loads
 
 def get_log_file_path():
     """
@@ -23,16 +21,22 @@ def get_log_file_path():
     /tmp is simpler and more predictable.
     """
     if os.name == 'nt':  # Windows
+        import tempfile
         temp_dir = tempfile.gettempdir()
         return os.path.join(temp_dir, 'sig_agent_hook_handler.log')
     else:  # Unix-like (macOS, Linux)
         return '/tmp/sig_agent_hook_handler.log'
 
+# Resolved once per process; log() is called many times per invocation
+LOG_FILE_PATH = get_log_file_path()
+
 def log(message, is_error=False):
     """
     Log message to a portable temp directory log file with timestamp.
     Only logs if SIG_AGENT_DEBUG environment variable is set.
     Uses system temp directory (works on Windows, macOS, Linux).
+    Each entry is appended with a single O_APPEND write, so entries from
+    concurrent hook processes do not interleave.
     """
     # Only log if SIG_AGENT_DEBUG is enabled
     if not os.getenv('SIG_AGENT_DEBUG'):
@@ -41,21 +45,39 @@ def log(message, is_error=False):
     timestamp = datetime.now().isoformat()
     log_entry = f"{timestamp} - {message}\n"
     try:
-        log_path = get_log_file_path()
-        with open(log_path, 'a', encoding='utf-8') as log_file:
-            log_file.write(log_entry)
+        fd = os.open(LOG_FILE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, log_entry.encode('utf-8'))
+        finally:
+            os.close(fd)
     except Exception as e:
         # Fallback to stderr if logging fails
         print(f"Logger error: {e}", file=sys.stderr)
 
+def utc_timestamp():
+    """
+    Return the current UTC time as an ISO 8601 string, e.g.
+    2024-01-01T12:00:00.000000Z. Uses an aware datetime, as
+    datetime.utcnow() is deprecated since Python 3.12.
+    """
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
 def create_ssl_context():
     """
     Create an SSL context with proper certificate verification.
     Most portable approach: tries certifi first, then system defaults,
     only disables verification as last resort.
+    ssl and certifi are imported here rather than at module load, so hook
+    invocations that never open an HTTPS connection do not pay for them.
     """
+    import ssl
+    try:
+        import certifi
+    except ImportError:
+        certifi = None
+    
     # Strategy 1: Use certifi if available (most portable and reliable)
-    if CERTIFI_AVAILABLE:
+    if certifi is not None:
         try:
             ssl_context = ssl.create_default_context(cafile=certifi.where())
             log("Using certifi certificate bundle for SSL verification")
@@ -82,84 +104,391 @@ def create_ssl_context():
     log("WARNING: SSL certificate verification disabled - insecure mode", is_error=True)
     return ssl_context
 
-def parse_transcript_file(transcript_path):
+# Bearer token entry in the comma-separated OTEL_EXPORTER_OTLP_HEADERS list
+AUTH_HEADER_RE = re.compile(r'(?:^|,)\s*Authorization=Bearer\s+([^,]+)')
+
+# Seconds a detached upload waits for the previous one before giving up
+UPLOAD_LOCK_TIMEOUT = 5
+UPLOAD_LOCK_POLL_INTERVAL = 0.05
+
+# Seconds to wait when handing hook input to the sig-agent daemon
+DAEMON_TIMEOUT = 1
+
+# Hook payloads larger than this are uploaded directly, never forwarded
+MAX_FRAME_SIZE = 64 << 20
+
+# Single-byte reply from the daemon: payload queued, or rejected
+DAEMON_ACK = b'\x01'
+DAEMON_NACK = b'\x00'
+
+# Read buffer for transcript files; transcripts can grow to tens of MB
+TRANSCRIPT_BUFFER_SIZE = 1 << 20
+
+# Request bodies larger than this are gzip-compressed; level 1 is cheap on CPU
+# and still shrinks repetitive transcript JSON several times over
+GZIP_MIN_SIZE = 4096
+GZIP_LEVEL = 1
+
+# Streamed request bodies are sent in chunks of about this size
+SEND_BUFFER_SIZE = 64 * 1024
+
+# Built on first HTTPS connection and reused; loading the CA bundle is expensive
+SSL_CONTEXT = None
+
+def get_ssl_context():
     """
-    Parse transcript JSONL file line by line.
-    Returns array of dictionaries up to the point of parsing failure.
+    Return the process-wide SSL context, creating it on first use.
+    """
+    global SSL_CONTEXT
+    if SSL_CONTEXT is None:
+        SSL_CONTEXT = create_ssl_context()
+    return SSL_CONTEXT
+
+def iter_transcript_lines(transcript_path):
+    """
+    Read transcript JSONL file line by line.
+    Yields the raw bytes of each JSON line up to the point of parsing failure.
+    Lines are validated and forwarded as-is, never re-serialized.
     """
-    parsed_records = []
-    
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as file:
+        with open(transcript_path, 'rb', buffering=TRANSCRIPT_BUFFER_SIZE) as file:
             for line_num, line in enumerate(file, 1):
-                line = line.strip()
-                if not line:  # Skip empty lines
+                line = line.rstrip(b'\r\n')
+                if not line or line.isspace():  # Skip empty lines
                     continue
                     
                 try:
-                    record = json.loads(line)
-                    parsed_records.append(record)
-                except json.JSONDecodeError as e:
+                    json_loads(line)
+                except ValueError as e:  # JSONDecodeError, or invalid UTF-8
                     log(f"Error parsing JSON on line {line_num}: {e}", is_error=True)
-                    log(f"Failed line content: {line}", is_error=True)
+                    log(f"Failed line content: {line.decode('utf-8', 'replace')}", is_error=True)
                     break  # Stop parsing on first error
+                
+                yield line
                     
     except FileNotFoundError:
         log(f"Error: Transcript file not found: {transcript_path}", is_error=True)
     except Exception as e:
         log(f"Error reading transcript file: {e}", is_error=True)
+
+def get_proxy(url):
+    """
+    Return the split proxy URL to use for the given URL, or None for a direct
+    connection. Honours http_proxy/https_proxy/no_proxy (and system proxy
+    settings) the same way urlopen's default ProxyHandler does.
+    """
+    from urllib.parse import urlsplit
+    from urllib.request import getproxies, proxy_bypass
+    parsed = urlsplit(url)
+    proxy = getproxies().get(parsed.scheme)
+    if not proxy or proxy_bypass(parsed.hostname):
+        return None
+    if '://' not in proxy:
+        proxy = f"http://{proxy}"
+    return urlsplit(proxy)
+
+def proxy_auth_headers(proxy):
+    """
+    Return a Proxy-Authorization header for credentials in the proxy URL.
+    """
+    if proxy is None or not proxy.username:
+        return {}
+    import base64
+    from urllib.parse import unquote
+    credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    return {'Proxy-Authorization': 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')}
+
+def request_target(url):
+    """
+    Return the request target for an HTTP request line, plus any extra headers
+    it needs. Plain HTTP through a proxy uses the absolute URL and carries the
+    proxy credentials; otherwise the target is the path (and query) part.
+    """
+    from urllib.parse import urlsplit
+    parsed = urlsplit(url)
+    if parsed.scheme == 'http':
+        proxy = get_proxy(url)
+        if proxy is not None:
+            return url, proxy_auth_headers(proxy)
+    
+    path = parsed.path or '/'
+    if parsed.query:
+        path = f"{path}?{parsed.query}"
+    return path, {}
+
+def open_connection(url, timeout=30):
+    """
+    Open a keep-alive HTTP(S) connection to the host of the given URL, or to
+    its proxy. HTTPS goes through a CONNECT tunnel when proxied.
+    The connection is shared by the hook and log requests, so the second
+    request reuses the socket and skips the TCP and TLS handshakes.
+    Raises ValueError if the URL is not a usable http(s) URL.
+    """
+    from http.client import HTTPConnection, HTTPSConnection
+    from urllib.parse import urlsplit
+    parsed = urlsplit(url)
+    parsed.port  # Raises ValueError for an out-of-range or non-numeric port
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError(f"not an http(s) URL: {url}")
+    proxy = get_proxy(url)
     
-    return parsed_records
+    if parsed.scheme == 'https':
+        if proxy is None:
+            return HTTPSConnection(parsed.hostname, parsed.port, timeout=timeout,
+                                   context=get_ssl_context())
+        conn = HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=timeout,
+                               context=get_ssl_context())
+        conn.set_tunnel(parsed.hostname, parsed.port or 443, headers=proxy_auth_headers(proxy))
+        return conn
+    
+    if proxy is None:
+        return HTTPConnection(parsed.hostname, parsed.port, timeout=timeout)
+    return HTTPConnection(proxy.hostname, proxy.port or 80, timeout=timeout)
+
+def send_chunk(conn, chunk):
+    """
+    Send one chunk of a Transfer-Encoding: chunked request body.
+    """
+    if chunk:
+        conn.send(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b"\r\n")
 
-def upload_to_log_service(log_url, sigagent_token, hook_data, transcript_records):
+class ChunkedBodyWriter:
     """
-    Upload parsed transcript records to the log service.
+    Chunked request body writer that coalesces small writes (one per
+    transcript line) into a bytearray and sends it as one chunk once it
+    reaches SEND_BUFFER_SIZE, optionally gzip-compressing on the way out.
     """
+    def __init__(self, conn, compress=False):
+        self.conn = conn
+        self.buffer = bytearray()
+        # wbits=31 produces a gzip container rather than a raw zlib stream
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    
+    def _send(self, data):
+        if self.compressor:
+            data = self.compressor.compress(data)
+        send_chunk(self.conn, data)
+    
+    def _flush_buffer(self):
+        if self.buffer:
+            self._send(self.buffer)
+            self.buffer.clear()
+    
+    def write(self, data):
+        # Large blocks (raw transcript reads) skip the copy into the buffer
+        if len(data) >= SEND_BUFFER_SIZE:
+            self._flush_buffer()
+            self._send(data)
+            return
+        
+        self.buffer += data
+        if len(self.buffer) >= SEND_BUFFER_SIZE:
+            self._flush_buffer()
+    
+    def close(self):
+        """
+        Send any buffered data, the gzip trailer, and the terminating chunk.
+        """
+        self._flush_buffer()
+        if self.compressor:
+            send_chunk(self.conn, self.compressor.flush())
+        self.conn.send(b"0\r\n\r\n")
+
+def send_transcript_records(write, hook_json, upload_timestamp, transcript_path):
+    """
+    Write the JSON log body: the hook data and an array of transcript records.
+    Returns the number of records written.
+    """
+    write(b'{"hook_data":')
+    write(hook_json)
+    write(b',"upload_timestamp":"' + upload_timestamp.encode('ascii') + b'","transcript_records":[')
+    record_count = 0
+    for line in iter_transcript_lines(transcript_path):
+        if record_count:
+            write(b',')
+        write(line)
+        record_count += 1
+    write(b']}')
+    return record_count
+
+def send_raw_transcript(write, hook_json, upload_timestamp, transcript_path):
+    """
+    Write the NDJSON log body: one envelope line with the hook data, followed
+    by the transcript file copied verbatim up to its last complete line,
+    without parsing any records. Returns the number of transcript bytes
+    written.
+    """
+    # Newlines outside JSON strings are plain whitespace, so flattening them
+    # keeps the envelope valid and on a single line
+    hook_line = hook_json.replace(b'\r', b' ').replace(b'\n', b' ')
+    write(b'{"hook_data":')
+    write(hook_line)
+    write(b',"upload_timestamp":"' + upload_timestamp.encode('ascii') + b'"}\n')
+    byte_count = 0
     try:
-        # Prepare payload with hook data and parsed transcript records
-        payload = {
-            'hook_data': hook_data,
-            'transcript_records': transcript_records,
-            'upload_timestamp': datetime.utcnow().isoformat() + 'Z'
-        }
+        file = open(transcript_path, 'rb')
+    except FileNotFoundError:
+        log(f"Error: Transcript file not found: {transcript_path}", is_error=True)
+        return byte_count
+    except OSError as e:
+        log(f"Error reading transcript file: {e}", is_error=True)
+        return byte_count
+    
+    # Only reads are guarded; send errors from write() reach the caller.
+    # Bytes after the last newline are held back until the newline arrives,
+    # so a line Claude is still writing is never sent half-finished.
+    tail = b''
+    with file:
+        while True:
+            try:
+                block = file.read(TRANSCRIPT_BUFFER_SIZE)
+            except OSError as e:
+                log(f"Error reading transcript file: {e}", is_error=True)
+                break
+            if not block:
+                break
+            cut = block.rfind(b'\n') + 1
+            if not cut:
+                tail += block
+                continue
+            if tail:
+                write(tail)
+                byte_count += len(tail)
+            write(block[:cut])
+            byte_count += cut
+            tail = block[cut:]
+    if tail:
+        log(f"Skipped {len(tail)} bytes of incomplete last transcript line")
+    return byte_count
+
+def upload_to_log_service(conn, log_url, sigagent_token, hook_json, transcript_path):
+    """
+    Stream the transcript to the log service. Returns True on success.
+    The request body is written with chunked transfer encoding through
+    ChunkedBodyWriter, so at most about SEND_BUFFER_SIZE of the transcript is
+    held in memory at a time. hook_json is the already-validated hook JSON, embedded as-is.
+    If SIG_AGENT_RAW_TRANSCRIPT is set, the transcript is forwarded verbatim as
+    NDJSON instead of being validated and wrapped in a JSON array.
+    Bodies for transcripts over GZIP_MIN_SIZE are gzip-compressed on the fly.
+    """
+    try:
+        raw_transcript = os.getenv('SIG_AGENT_RAW_TRANSCRIPT')
+        upload_timestamp = utc_timestamp()
+        
+        try:
+            compress = os.path.getsize(transcript_path) > GZIP_MIN_SIZE
+        except OSError:
+            compress = False
         
-        # Convert payload to JSON bytes
-        json_data = json.dumps(payload).encode('utf-8')
+        target, proxy_headers = request_target(log_url)
+        conn.putrequest('POST', target)
+        for name, value in proxy_headers.items():
+            conn.putheader(name, value)
+        conn.putheader('Content-Type', 'application/x-ndjson' if raw_transcript else 'application/json')
+        conn.putheader('User-Agent', 'sig-agent/1.0')
+        conn.putheader('Authorization', f'Bearer {sigagent_token}')
+        conn.putheader('Transfer-Encoding', 'chunked')
+        if compress:
+            conn.putheader('Content-Encoding', 'gzip')
+        conn.endheaders()
         
-        # Create request with headers
-        req = Request(
-            log_url,
-            data=json_data,
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'sig-agent/1.0',
-                'Authorization': f'Bearer {sigagent_token}'
-            }
-        )
+        # Send POST body, then the terminating zero-length chunk
+        writer = ChunkedBodyWriter(conn, compress)
+        if raw_transcript:
+            byte_count = send_raw_transcript(writer.write, hook_json, upload_timestamp, transcript_path)
+            summary = f"{byte_count} bytes of raw transcript"
+        else:
+            record_count = send_transcript_records(writer.write, hook_json, upload_timestamp, transcript_path)
+            summary = f"{record_count} transcript records"
+        writer.close()
         
-        # Send POST request
-        ssl_context = create_ssl_context()
-        with urlopen(req, timeout=30, context=ssl_context) as response:
-            response_data = response.read().decode('utf-8')
-            
-            if response.status >= 400:
-                log(f"Log service error: {response_data}", is_error=True)
-            else:
-                log(f"Successfully uploaded {len(transcript_records)} transcript records to log service")
+        response = conn.getresponse()
+        response_data = response.read().decode('utf-8')
+        
+        if response.status >= 400:
+            log(f"Log service HTTP error {response.status}: {response_data}", is_error=True)
+        else:
+            log(f"Successfully uploaded {summary} to log service")
+            return True
                 
-    except HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else "No error details"
-        log(f"Log service HTTP error {e.code}: {error_body}", is_error=True)
-    except URLError as e:
-        log(f"Log service URL error: {e.reason}", is_error=True)
+    except OSError as e:
+        log(f"Log service connection error: {e}", is_error=True)
     except Exception as e:
         log(f"Log service error: {e}", is_error=True)
+    return False
 
-def main():
-    # Log arguments to /tmp/log.txt
-    log(f"main() called with arguments: {sys.argv}")
+def post_hook(conn, target, body, headers):
+    """
+    Send the hook POST and return its response. If the connection was being
+    reused and the server had already closed it, the request fails before
+    any response arrives; reconnect and send it once more in that case.
+    """
+    from http.client import RemoteDisconnected
+    reused = conn.sock is not None
+    try:
+        conn.request('POST', target, body=body, headers=headers)
+        return conn.getresponse()
+    except (BrokenPipeError, ConnectionResetError, RemoteDisconnected) as e:
+        if not reused:
+            raise
+        log(f"Kept-alive connection closed by server ({e}), retrying on a new connection")
+        conn.close()
+        conn.request('POST', target, body=body, headers=headers)
+        return conn.getresponse()
+
+def send_to_sigagent(conn, sigagent_url, sigagent_token, hook_json, transcript_path):
+    """
+    POST the hook data to the sigagent hook endpoint, then stream the
+    transcript to the log service over the same connection.
+    Returns True if both requests succeeded.
+    """
+    hook_url = f"{sigagent_url}/v0/claude/hook"
+    log_url = f"{sigagent_url}/v0/claude/log"
     
-    # Read OpenTelemetry environment variables
+    try:
+        # Prepare payload, embedding the hook JSON as-is instead of
+        # re-serializing it as an escaped string
+        json_data = b''.join((
+            b'{"hook_data":', hook_json,
+            b',"hook_timestamp":"', utc_timestamp().encode('ascii'), b'"}'
+        ))
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'sig-agent/1.0',
+            'Authorization': f'Bearer {sigagent_token}'
+        }
+        if len(json_data) > GZIP_MIN_SIZE:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            json_data = compressor.compress(json_data) + compressor.flush()
+            headers['Content-Encoding'] = 'gzip'
+        
+        # Send POST request
+        target, proxy_headers = request_target(hook_url)
+        headers.update(proxy_headers)
+        response = post_hook(conn, target, json_data, headers)
+        response_data = response.read().decode('utf-8')
+        
+        # Log response for debugging if status indicates error
+        if response.status >= 400:
+            log(f"Hook monitor HTTP error {response.status}: {response_data}", is_error=True)
+            return False
+
+        # Stream transcript records to log service over the same connection
+        log(f"Streaming transcript file: {transcript_path}")
+        return upload_to_log_service(conn, log_url, sigagent_token, hook_json, transcript_path)
+            
+    except OSError as e:
+        log(f"Hook monitor connection error: {e}", is_error=True)
+    except Exception as e:
+        log(f"Hook monitor error: {e}", is_error=True)
+    return False
+
+def read_config():
+    """
+    Read the sigagent endpoint and bearer token from the OpenTelemetry
+    environment variables. Returns (sigagent_url, sigagent_token); either is
+    None, with the error logged, if it is not configured.
+    """
     sigagent_url = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
     sigagent_token = None
     
@@ -167,87 +496,216 @@ def main():
     otel_headers = os.getenv('OTEL_EXPORTER_OTLP_HEADERS')
     if otel_headers:
         # Parse headers to find Authorization=Bearer token
-        headers_parts = otel_headers.split(',')
-        for part in headers_parts:
-            part = part.strip()
-            if part.startswith('Authorization=Bearer '):
-                sigagent_token = part.replace('Authorization=Bearer ', '')
-                break
+        match = AUTH_HEADER_RE.search(otel_headers)
+        if match:
+            sigagent_token = match.group(1).strip()
     
-    # Check that both required OpenTelemetry environment variables are set
     if not sigagent_url:
         log("Error: OTEL_EXPORTER_OTLP_ENDPOINT environment variable is required", is_error=True)
-        sys.exit(1)
     
     if not sigagent_token:
         log("Error: OTEL_EXPORTER_OTLP_HEADERS with Authorization=Bearer token is required", is_error=True)
-        sys.exit(1)
+    
+    return sigagent_url, sigagent_token
 
-    hook_url = f"{sigagent_url}/v0/claude/hook"
-    log_url = f"{sigagent_url}/v0/claude/log"
+def parse_hook_input(hook_json):
+    """
+    Parse hook input JSON and return its transcript_path, or None (with the
+    error logged) if the input is invalid or has no transcript_path.
+    """
+    try:
+        hook_data = json_loads(hook_json)
+    except ValueError as e:  # JSONDecodeError, or invalid UTF-8 in the input
+        log(f"Error parsing hook JSON: {e}", is_error=True)
+        return None
     
-    # Read hook input from stdin
-    hook_stdin = sys.stdin.read()
+    transcript_path = hook_data.get('transcript_path') if isinstance(hook_data, dict) else None
+    if not transcript_path:
+        log("Error: transcript_path not found in hook data", is_error=True)
+        return None
+    return transcript_path
+
+def get_socket_path():
+    """
+    Path of the sig-agent daemon's Unix socket: SIG_AGENT_SOCKET if set,
+    otherwise sig-agent.sock in XDG_RUNTIME_DIR. None if neither is set.
+    """
+    socket_path = os.getenv('SIG_AGENT_SOCKET')
+    if socket_path:
+        return socket_path
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'sig-agent.sock')
+    return None
+
+def config_fingerprint(sigagent_url, sigagent_token):
+    """
+    SHA-256 digest of the endpoint and token, sent ahead of each frame so
+    the daemon only accepts hooks configured for the same destination
+    without the token itself crossing the socket.
+    """
+    import hashlib
+    return hashlib.sha256(f"{sigagent_url}\0{sigagent_token}".encode('utf-8')).digest()
+
+def forward_to_daemon(hook_json, sigagent_url, sigagent_token):
+    """
+    Hand the hook input to a running sig-agent daemon (sig_agent_daemon.py)
+    as the config fingerprint, a 4-byte big-endian length and the raw bytes,
+    then wait for the daemon's one-byte acknowledgement. The daemon keeps
+    its connection and SSL context warm and does the uploads. Returns False
+    if no daemon is listening or it did not accept the payload, e.g. because
+    it uploads to a different endpoint or with a different token, so the
+    caller uploads itself.
+    """
+    socket_path = get_socket_path()
+    if not socket_path or not os.path.exists(socket_path):
+        return False
+    if len(hook_json) > MAX_FRAME_SIZE:
+        return False
+    
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
     
-    # Parse hook data to extract transcript_path
     try:
-        hook_data = json.loads(hook_stdin)
-        transcript_path = hook_data.get('transcript_path')
-        
-        if not transcript_path:
-            log("Error: transcript_path not found in hook data", is_error=True)
-            sys.exit(1)
-            
-    except json.JSONDecodeError as e:
-        log(f"Error parsing hook JSON: {e}", is_error=True)
-        sys.exit(1)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall(config_fingerprint(sigagent_url, sigagent_token)
+                         + len(hook_json).to_bytes(4, 'big') + hook_json)
+            ack = sock.recv(1)
+    except OSError as e:
+        log(f"sig-agent daemon unavailable at {socket_path}: {e}, uploading directly", is_error=True)
+        return False
+    if ack != DAEMON_ACK:
+        log(f"sig-agent daemon at {socket_path} did not accept hook data, uploading directly", is_error=True)
+        return False
+    
+    log(f"Forwarded hook data to sig-agent daemon at {socket_path}")
+    return True
+
+def get_lock_file_path():
+    """
+    Per-user path of the upload lock file: sig-agent-upload.lock in
+    XDG_RUNTIME_DIR, or a file named after the user id in the system temp
+    directory, so other users cannot hold or share it.
+    """
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'sig-agent-upload.lock')
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), f'sig_agent_upload-{os.getuid()}.lock')
+
+def acquire_upload_lock():
+    """
+    Take the per-user upload lock, so detached uploads run one at a time and
+    hook events reach the server in the order they fired in the usual case.
+    Waits at most UPLOAD_LOCK_TIMEOUT seconds for the previous upload.
+    Returns False if the lock could not be taken in time, in which case the
+    upload should be dropped rather than queued behind a stuck one.
+    The descriptor is left open, so the lock is released when the process
+    exits. Returns True without locking where fcntl is unavailable (Windows,
+    where uploads are synchronous anyway) or the lock file is unusable.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    
+    lock_path = get_lock_file_path()
+    try:
+        fd = os.open(lock_path, os.O_RDONLY | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        if os.fstat(fd).st_uid != os.getuid():
+            os.close(fd)
+            log(f"Upload lock {lock_path} is owned by another user, uploading unserialized", is_error=True)
+            return True
+    except OSError as e:
+        log(f"Failed to open upload lock {lock_path}: {e}, uploading unserialized", is_error=True)
+        return True
     
-    # Parse transcript file
-    log(f"Parsing transcript file: {transcript_path}")
-    transcript_records = parse_transcript_file(transcript_path)
-    log(f"Successfully parsed {len(transcript_records)} transcript records")
+    deadline = time.monotonic() + UPLOAD_LOCK_TIMEOUT
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                log(f"Previous upload still running after {UPLOAD_LOCK_TIMEOUT}s, dropping this hook", is_error=True)
+                return False
+            time.sleep(UPLOAD_LOCK_POLL_INTERVAL)
+        except OSError as e:
+            os.close(fd)
+            log(f"Failed to lock {lock_path}: {e}, uploading unserialized", is_error=True)
+            return True
+
+def detach():
+    """
+    Fork a detached child process to perform the uploads, so Claude does not
+    wait on the network round-trips. Returns True in the process that should
+    do the work: the child, or the current process where fork is unavailable
+    (Windows) or fails.
+    """
+    if not hasattr(os, 'fork'):
+        return True
     
-    # Send POST request to monitoring service
     try:
-        # Prepare payload
-        payload = {
-            'hook_stdin': hook_stdin,
-            'hook_timestamp': datetime.utcnow().isoformat() + 'Z'
-        }
-        
-        # Convert payload to JSON bytes
-        json_data = json.dumps(payload).encode('utf-8')
-        
-        # Create request with headers
-        req = Request(
-            hook_url,
-            data=json_data,
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'sig-agent/1.0',
-                'Authorization': f'Bearer {sigagent_token}'
-            }
-        )
-        
-        # Send POST request
-        ssl_context = create_ssl_context()
-        with urlopen(req, timeout=30, context=ssl_context) as response:
-            response_data = response.read().decode('utf-8')
-            
-            # Log response for debugging if status indicates error
-            if response.status >= 400:
-                log(f"Hook monitor error: {response_data}", is_error=True)
+        pid = os.fork()
+    except OSError as e:
+        log(f"Failed to fork upload process: {e}, uploading synchronously", is_error=True)
+        return True
+    
+    if pid > 0:
+        return False
+    
+    # Child: leave the hook's session and release its stdio, so Claude sees
+    # the hook finish as soon as the parent exits
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    return True
 
-        # Upload parsed transcript records to log service
-        upload_to_log_service(log_url, sigagent_token, hook_data, transcript_records)
-            
-    except HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else "No error details"
-        log(f"Hook monitor HTTP error {e.code}: {error_body}", is_error=True)
-    except URLError as e:
-        log(f"Hook monitor URL error: {e.reason}", is_error=True)
-    except Exception as e:
-        log(f"Hook monitor error: {e}", is_error=True)
+def main():
+    # Log arguments to /tmp/log.txt
+    log(f"main() called with arguments: {sys.argv}")
+    
+    # Read hook input from stdin as bytes; it is forwarded without decoding
+    hook_json = sys.stdin.buffer.read()
+    
+    # Check that both required OpenTelemetry environment variables are set
+    sigagent_url, sigagent_token = read_config()
+    if not sigagent_url or not sigagent_token:
+        sys.exit(1)
+    
+    # Let the daemon do the uploads if one is running with the same config
+    if forward_to_daemon(hook_json, sigagent_url, sigagent_token):
+        return
+    
+    # Parse hook data to extract transcript_path
+    transcript_path = parse_hook_input(hook_json)
+    if not transcript_path:
+        sys.exit(1)
+    
+    # Hand the uploads off to a background process and return immediately
+    if not detach():
+        return
+    
+    # Wait for earlier hooks' uploads to finish
+    if not acquire_upload_lock():
+        return
+    
+    # Send POST requests to the monitoring service
+    try:
+        conn = open_connection(sigagent_url)
+    except ValueError as e:
+        log(f"Error: invalid OTEL_EXPORTER_OTLP_ENDPOINT: {e}", is_error=True)
+        return
+    try:
+        send_to_sigagent(conn, sigagent_url, sigagent_token, hook_json, transcript_path)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()